@@ -1,38 +1,197 @@
 import os
-import json
+import re
+import mmap
+import random
+import atexit
+import time
+import queue
 import asyncio
+import logging
+import logging.handlers
+import functools
+import itertools
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 import aiohttp
 import discord
+import orjson
 from discord.ext import commands, tasks
 
+try:
+    # Optional C parser, much faster than datetime.fromisoformat and handles "Z"
+    from ciso8601 import parse_datetime as _parse_datetime
+except ImportError:
+    _parse_datetime = None
+
 # ================== CONFIG ==================
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 DATA_FILE = "bot_data.json"
+SAVE_DEBOUNCE_SECONDS = 1.0  # coalesce bursts of changes into one write
+SAVE_RETRY_SECONDS = 30  # wait before retrying a failed write
+MMAP_THRESHOLD_BYTES = 1 << 20  # read bigger data files through mmap
 POLL_INTERVAL_SECONDS = 300  # 5 minutes
+QUIET_POLL_INTERVAL_SECONDS = 900  # 15 minutes, once nothing new has shown up for a while
+QUIET_AFTER_SECONDS = 3600  # how long without new chapters counts as quiet
+MAX_POLL_BACKOFF_SECONDS = 3600  # slowest we back off to after repeated failures
+START_JITTER_SECONDS = 30  # spread first polls so restarts don't line up
 ALLOWED_ROLE_NAMES = {"Admin", "Moderator", "Staff"}
 
 MANGADEX_API_BASE = "https://api.mangadex.org"
+HTTP_TIMEOUT_SECONDS = 30
+MAX_CONCURRENT_FETCHES = 10  # caps in-flight MangaDex requests, not requests per second
+SERIES_PER_REQUEST = 20  # manga[] filters per /chapter call
+MAX_PAGES_PER_BATCH = 5  # extra /chapter pages fetched when one series floods a batch
+MESSAGE_CHAR_LIMIT = 1900  # stay safely under Discord's 2000 per message
+DEFAULT_RETRY_AFTER_SECONDS = 60  # used when a 429 has no usable Retry-After
+
+# ================== LOGGING ==================
+
+# Handlers run on a listener thread so log I/O never blocks the event loop
+logger = logging.getLogger("bot")
+logger.setLevel(logging.INFO)
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(
+    logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+)
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+atexit.register(_log_listener.stop)  # drain whatever is still queued on exit
 
 # ================== STORAGE ==================
 
 
+@dataclass(slots=True)
+class Series:
+    """A tracked series in memory. On disk it stays a plain {name, last_seen_ts, role_id, primed} dict."""
+
+    name: str
+    last_seen_ts: Optional[str] = None
+    role_id: Optional[int] = None
+    # False only for rows saved before !track primed series itself; a primed
+    # series with last_seen_ts None just had no chapters yet
+    primed: bool = True
+    # last_seen_ts in normalize_ts form, so polling never re-normalizes it
+    since_norm: Optional[str] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.set_last_seen(self.last_seen_ts)
+
+    def set_last_seen(self, ts: Optional[str]) -> None:
+        self.last_seen_ts = ts
+        self.since_norm = normalize_ts(ts) if ts else None
+
+    @classmethod
+    def from_dict(cls, series_id: str, d: Dict[str, Any]) -> "Series":
+        return cls(
+            name=d.get("name", f"Series {series_id}"),
+            last_seen_ts=d.get("last_seen_ts"),
+            role_id=d.get("role_id"),
+            primed=d.get("primed", d.get("last_seen_ts") is not None),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "last_seen_ts": self.last_seen_ts,
+            "role_id": self.role_id,
+            "primed": self.primed,
+        }
+
+
+def _read_data_file() -> Dict[str, Any]:
+    with open(DATA_FILE, "rb") as f:
+        if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD_BYTES:
+            # Let orjson decode straight from the mapping instead of copying the file
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+        return orjson.loads(f.read())
+
+
 def load_data() -> Dict[str, Any]:
     if not os.path.exists(DATA_FILE):
         return {"guilds": {}}
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    d = _read_data_file()
+    for gdata in d.get("guilds", {}).values():
+        tracked = gdata.get("tracked_series", {})
+        gdata["tracked_series"] = {
+            sid: Series.from_dict(sid, sdata) for sid, sdata in tracked.items()
+        }
+    return d
+
+
+def _atomic_write(path: str, buf: bytes) -> None:
+    # Write to a temp file and swap it in so a crash never leaves half a file
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(buf)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        # Make sure the bytes are on disk before the rename can expose them
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+
+def _encode(obj: Any) -> Any:
+    if isinstance(obj, Series):
+        return obj.to_dict()
+    raise TypeError(f"Can't serialize {type(obj).__name__}")
+
+
+# Serializes writers; the flusher and _final_flush would otherwise share the temp file
+_save_lock = asyncio.Lock()
 
 
-def save_data(d: Dict[str, Any]) -> None:
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(d, f, indent=2)
+async def save_data(d: Dict[str, Any]) -> None:
+    async with _save_lock:
+        # Serialize on the loop so nothing mutates d mid-dump, then hand the disk I/O to a thread
+        buf = orjson.dumps(d, default=_encode, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+        await asyncio.to_thread(_atomic_write, DATA_FILE, buf)
 
 
-data = load_data()
+# Populated from DATA_FILE in setup_hook, before the gateway connects
+data: Dict[str, Any] = {"guilds": {}}
+
+# Set whenever `data` changes; _flusher writes it out after a quiet period
+_dirty = asyncio.Event()
+_flusher_task: Optional[asyncio.Task] = None
+
+
+def mark_dirty() -> None:
+    _dirty.set()
+
+
+async def _flusher() -> None:
+    while True:
+        await _dirty.wait()
+        # Only write once SAVE_DEBOUNCE_SECONDS pass without another mark_dirty()
+        while _dirty.is_set():
+            _dirty.clear()
+            await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+        try:
+            await save_data(data)
+        except Exception as e:
+            logger.error("Failed to save %s, retrying in %ds: %s", DATA_FILE, SAVE_RETRY_SECONDS, e)
+            # Keep the changes pending instead of waiting for an unrelated mark_dirty()
+            await asyncio.sleep(SAVE_RETRY_SECONDS)
+            mark_dirty()
+
+
+async def _final_flush() -> None:
+    if _dirty.is_set():
+        _dirty.clear()
+        await save_data(data)
 
 # ================== DISCORD SETUP ==================
 
@@ -51,6 +210,15 @@ bot = commands.Bot(
     intents=intents,
     allowed_mentions=allowed_mentions,
 )
+bot.add_listener(_final_flush, "on_disconnect")
+
+
+@bot.event
+async def setup_hook():
+    # Load in a thread so startup doesn't block the loop on disk I/O
+    loaded = await asyncio.to_thread(load_data)
+    data.clear()
+    data.update(loaded)
 
 
 def get_guild_data(guild_id: int) -> Dict[str, Any]:
@@ -60,214 +228,584 @@ def get_guild_data(guild_id: int) -> Dict[str, Any]:
     if gid not in data["guilds"]:
         data["guilds"][gid] = {
             "announce_channel_id": None,
-            "tracked_series": {}  # series_id -> {name, last_seen_ts, role_id}
+            "tracked_series": {}  # series_id -> Series
         }
     return data["guilds"][gid]
 
 
+# Filled in on_ready so DM permission checks don't call the API every time
+_APP_OWNER_ID: Optional[int] = None
+
+
+async def get_app_owner_id() -> int:
+    global _APP_OWNER_ID
+    if _APP_OWNER_ID is None:
+        app_info = await bot.application_info()
+        _APP_OWNER_ID = app_info.owner.id
+    return _APP_OWNER_ID
+
+
 def is_staff_or_owner():
     async def predicate(ctx: commands.Context):
         if ctx.guild and ctx.author.id == ctx.guild.owner_id:
             return True
 
         if ctx.guild is None:
-            app_info = await bot.application_info()
-            return ctx.author.id == app_info.owner.id
+            return ctx.author.id == await get_app_owner_id()
 
-        if isinstance(ctx.author, discord.Member):
-            role_names = {r.name for r in ctx.author.roles}
-            if ALLOWED_ROLE_NAMES & role_names:
-                return True
+        if isinstance(ctx.author, discord.Member) and any(
+            r.name in ALLOWED_ROLE_NAMES for r in ctx.author.roles
+        ):
+            return True
 
         raise commands.CheckFailure("You don't have permission to use this command.")
     return commands.check(predicate)
 
+# channel_id -> resolved channel, so only the first lookup can cost a REST call
+_channel_cache: Dict[int, discord.abc.Messageable] = {}
+
+
+async def resolve_channel(channel_id: int) -> Optional[discord.abc.Messageable]:
+    channel = _channel_cache.get(channel_id) or bot.get_channel(channel_id)
+    if channel is None:
+        try:
+            channel = await bot.fetch_channel(channel_id)
+        except Exception:
+            return None
+    _channel_cache[channel_id] = channel
+    return channel
+
 # ================== MANGADEX HELPERS ==================
 
+_fetch_semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
 
-def parse_iso(dt_str: str) -> datetime:
-    # MangaDex returns ISO8601, sometimes with Z
+# time.monotonic() before which we don't send MangaDex anything
+_rate_limited_until = 0.0
+
+
+class RateLimited(Exception):
+    """MangaDex answered 429; wait `delay` seconds before asking again."""
+
+    def __init__(self, delay: float):
+        super().__init__(f"rate limited for {delay:.0f}s")
+        self.delay = delay
+
+
+class FetchFailed(Exception):
+    """A MangaDex request failed for any other reason; already logged where it happened."""
+
+
+def _retry_after_seconds(header: Optional[str]) -> float:
+    try:
+        return max(float(header), 0.0)
+    except (TypeError, ValueError):
+        return float(DEFAULT_RETRY_AFTER_SECONDS)
+
+
+def normalize_ts(dt_str: str) -> str:
+    # MangaDex returns ISO8601 in UTC, sometimes with Z. Once the suffix is
+    # uniform the strings sort the same way the datetimes would.
     if dt_str.endswith("Z"):
-        dt_str = dt_str[:-1] + "+00:00"
-    return datetime.fromisoformat(dt_str)
+        return dt_str[:-1] + "+00:00"
+    return dt_str
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_iso(dt_str: str) -> datetime:
+    # Display-only helper with no callers yet; comparisons work on normalize_ts strings
+    if _parse_datetime is not None:
+        return _parse_datetime(dt_str)
+    return datetime.fromisoformat(normalize_ts(dt_str))
 
 
-async def fetch_latest_for_series(
+async def _get_json(
     session: aiohttp.ClientSession,
-    manga_id: str,
-    since_ts: Optional[str],
-) -> List[Dict[str, Any]]:
+    path: str,
+    params: List[Tuple[str, str]],
+) -> Dict[str, Any]:
+    global _rate_limited_until
+    async with _fetch_semaphore:
+        # Once one request is refused, don't let the queued ones pile on
+        wait = _rate_limited_until - time.monotonic()
+        if wait > 0:
+            raise RateLimited(wait)
+
+        async with session.get(f"{MANGADEX_API_BASE}{path}", params=params) as resp:
+            if resp.status == 429:
+                delay = _retry_after_seconds(resp.headers.get("Retry-After"))
+                _rate_limited_until = time.monotonic() + delay
+                raise RateLimited(delay)
+            resp.raise_for_status()
+            return await resp.json(loads=orjson.loads)
+
+
+async def fetch_latest_for_series_batch(
+    session: aiohttp.ClientSession,
+    manga_ids: List[str],
+    since_map: Dict[str, Optional[str]],
+    limit: int = 100,
+) -> Dict[str, List[Dict[str, Any]]]:
     """
-    Call MangaDex to get the latest chapters for a given manga.
-
-    Returns a list of chapters newer than since_ts:
-    [
-      {
-        "id": "...",
-        "chapter": "45",
-        "url": "https://mangadex.org/chapter/...",
-        "readableAt": "2024-05-01T12:34:56+00:00",
-      },
+    Call MangaDex once for several manga and group the chapters by manga ID.
+
+    since_map values must already be normalized with normalize_ts.
+
+    Returns {manga_id: [chapter, ...]} where each list holds chapters newer
+    than since_map[manga_id], sorted oldest -> newest:
+    {
+      "a1b2c3d4-...": [
+        {
+          "id": "...",
+          "chapter": "45",
+          "url": "https://mangadex.org/chapter/...",
+          "readableAt": "2024-05-01T12:34:56+00:00",
+        },
+        ...
+      ],
       ...
-    ]
-    """
-    params = {
-        "manga": manga_id,
-        "limit": 20,
-        "order[readableAt]": "desc",
-        "translatedLanguage[]": "en",  # adjust if you want other languages
-        "includeFutureUpdates": "0",
     }
+    Manga with nothing new are left out.
+
+    The newest `limit` chapters are shared by the whole batch, so if one
+    series fills the page we keep paging until we reach the oldest
+    since_map entry, up to MAX_PAGES_PER_BATCH pages.
+    """
+    params = [("manga[]", mid) for mid in manga_ids] + [
+        ("limit", str(limit)),
+        ("order[readableAt]", "desc"),
+        ("translatedLanguage[]", "en"),  # adjust if you want other languages
+        ("includeFutureUpdates", "0"),
+    ]
+    # Series that have never seen a chapter give no bound, so they don't drive paging
+    oldest_since = min((ts for ts in since_map.values() if ts), default=None)
 
-    async with session.get(f"{MANGADEX_API_BASE}/chapter", params=params) as resp:
-        resp.raise_for_status()
-        payload = await resp.json()
+    items: List[Dict[str, Any]] = []
+    for page in range(MAX_PAGES_PER_BATCH):
+        payload = await _get_json(
+            session, "/chapter", params + [("offset", str(page * limit))]
+        )
+        page_items = payload.get("data", [])
+        items.extend(page_items)
+
+        if len(page_items) < limit or oldest_since is None:
+            break
+        oldest = page_items[-1].get("attributes", {}).get("readableAt")
+        if not oldest or normalize_ts(oldest) <= oldest_since:
+            break
+    else:
+        covered_from = normalize_ts(oldest)
+        behind = [mid for mid, ts in since_map.items() if ts and ts < covered_from]
+        logger.warning(
+            "Hit the %d page cap for %s; chapters before %s may have been skipped",
+            MAX_PAGES_PER_BATCH, ", ".join(behind), oldest,
+        )
 
-    items = payload.get("data", [])
-    chapters: List[Dict[str, Any]] = []
+    if not items:
+        # the common case once everything is primed
+        return {}
 
-    since_dt: Optional[datetime] = None
-    if since_ts:
-        since_dt = parse_iso(since_ts)
+    # manga_id -> [(normalized readableAt, chapter), ...]
+    dated: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+    # a chapter released mid-paging shifts offsets, so the same one can show up twice
+    seen_ids = set()
 
     for ch in items:
         ch_id = ch.get("id")
         attr = ch.get("attributes", {})
         chapter_num = attr.get("chapter") or "?"
         readable_at = attr.get("readableAt")
-        if not ch_id or not readable_at:
+        if not ch_id or not readable_at or ch_id in seen_ids:
             continue
+        seen_ids.add(ch_id)
 
-        ch_dt = parse_iso(readable_at)
+        manga_id = next(
+            (r.get("id") for r in ch.get("relationships", []) if r.get("type") == "manga"),
+            None,
+        )
+        if manga_id not in since_map:
+            continue
+
+        ch_norm = normalize_ts(readable_at)
 
         # Only keep chapters strictly newer than last seen
-        if since_dt and ch_dt <= since_dt:
+        since_norm = since_map[manga_id]
+        if since_norm and ch_norm <= since_norm:
             continue
 
-        chapters.append(
-            {
-                "id": ch_id,
-                "chapter": chapter_num,
-                "url": f"https://mangadex.org/chapter/{ch_id}",
-                "readableAt": readable_at,
-            }
+        dated.setdefault(manga_id, []).append(
+            (
+                ch_norm,
+                {
+                    "id": ch_id,
+                    "chapter": chapter_num,
+                    "url": f"https://mangadex.org/chapter/{ch_id}",
+                    "readableAt": readable_at,
+                },
+            )
         )
 
     # Sort oldest -> newest so notifications are in order
-    chapters.sort(key=lambda x: parse_iso(x["readableAt"]))
+    chapters: Dict[str, List[Dict[str, Any]]] = {}
+    for manga_id, series_chapters in dated.items():
+        series_chapters.sort(key=lambda x: x[0])
+        chapters[manga_id] = [chapter for _, chapter in series_chapters]
     return chapters
 
+
+async def fetch_latest_readable_at(
+    session: aiohttp.ClientSession,
+    manga_id: str,
+) -> Optional[str]:
+    """
+    Return readableAt of the newest chapter of a manga, or None if it has none yet.
+
+    Used to prime a series when it's tracked so old chapters are never announced.
+    """
+    params = [
+        ("limit", "1"),
+        ("order[readableAt]", "desc"),
+        ("translatedLanguage[]", "en"),  # keep in sync with fetch_latest_for_series_batch
+        ("includeFutureUpdates", "0"),
+    ]
+    payload = await _get_json(session, f"/manga/{manga_id}/feed", params)
+
+    for ch in payload.get("data", []):
+        readable_at = ch.get("attributes", {}).get("readableAt")
+        if readable_at:
+            return readable_at
+    return None
+
 # ================== BACKGROUND TASK ==================
 
+# Shared HTTP session for every MangaDex call, created on first use
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def make_session() -> aiohttp.ClientSession:
+    try:
+        # Async C resolver from aiohttp[speedups]; keeps DNS off the thread pool
+        resolver = aiohttp.AsyncResolver()
+    except RuntimeError:
+        resolver = aiohttp.ThreadedResolver()
+
+    connector = aiohttp.TCPConnector(
+        resolver=resolver,
+        limit=50,
+        limit_per_host=10,
+        ttl_dns_cache=300,
+        keepalive_timeout=75,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS),
+    )
+
+
+def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = make_session()
+    return _session
+
+
+# (series_id, [(message, readableAt), ...])
+SeriesResult = Tuple[str, List[Tuple[str, str]]]
+
+
+def _build_messages(
+    sdata: Series,
+    new_chapters: List[Dict[str, Any]],
+) -> List[Tuple[str, str]]:
+    """
+    Pack a series' new chapters into as few messages as Discord allows.
+
+    Returns [(message, readableAt of the newest chapter in it), ...].
+    """
+    series_name = sdata.name
+    role_id = sdata.role_id
+    role_mention = f"<@&{role_id}>" if role_id else ""
+
+    if len(new_chapters) == 1:
+        ch = new_chapters[0]
+        msg = (
+            f"{role_mention} New chapter released!\n"
+            f"**{series_name}** - Chapter {ch['chapter']}\n"
+            f"Link: {ch['url']}"
+        )
+        return [(msg, ch["readableAt"])]
+
+    # Everything per-series is formatted once; the loop only adds chapter lines
+    header = f"{role_mention} New chapters for **{series_name}**:"
+    header_len = len(header)
+    messages: List[Tuple[str, str]] = []
+    lines: List[str] = []
+    length = header_len
+    latest_ts = ""
+
+    for ch in new_chapters:
+        line = f"- Chapter {ch['chapter']}: {ch['url']}"
+        # split at chapter boundaries once the next line would overflow
+        if lines and length + 1 + len(line) > MESSAGE_CHAR_LIMIT:
+            messages.append(("\n".join([header, *lines]), latest_ts))
+            lines = []
+            length = header_len
+        lines.append(line)
+        length += 1 + len(line)
+        latest_ts = ch["readableAt"]
+
+    messages.append(("\n".join([header, *lines]), latest_ts))
+    return messages
+
+
+async def _prime_series(
+    session: aiohttp.ClientSession,
+    tracked: Dict[str, Series],
+    series_id: str,
+) -> List[SeriesResult]:
+    """
+    Quietly prime a series saved before it could be primed, so its old
+    chapters are never announced.
+    """
+    try:
+        last_seen_ts = await fetch_latest_readable_at(session, series_id)
+    except RateLimited:
+        raise
+    except Exception as e:
+        logger.error("MangaDex fetch (prime) failed for %s: %s", series_id, e)
+        raise FetchFailed() from e
+
+    sdata = tracked.get(series_id)
+    if sdata is not None and not sdata.primed:
+        sdata.set_last_seen(last_seen_ts)
+        sdata.primed = True
+        mark_dirty()
+        logger.info("Primed series %s at %s", series_id, last_seen_ts)
+    return []
+
+
+async def _process_chunk(
+    session: aiohttp.ClientSession,
+    chunk: List[Tuple[str, Series]],
+) -> List[SeriesResult]:
+    """
+    One batched request for chapters newer than each series' last_seen_ts.
+
+    last_seen_ts is advanced by the caller as messages are actually sent.
+    """
+    since_map = {series_id: sdata.since_norm for series_id, sdata in chunk}
+    try:
+        new_by_series = await fetch_latest_for_series_batch(
+            session, list(since_map), since_map
+        )
+    except RateLimited:
+        raise
+    except Exception as e:
+        logger.error("MangaDex fetch failed for %s: %s", ", ".join(since_map), e)
+        # raise so check_releases counts this cycle as failed and backs off
+        raise FetchFailed() from e
+
+    return [
+        (series_id, _build_messages(sdata, new_by_series[series_id]))
+        for series_id, sdata in chunk
+        if series_id in new_by_series
+    ]
+
+
+async def _announce(
+    channel: discord.abc.Messageable,
+    results: List[Tuple[Dict[str, Series], str, List[Tuple[str, str]]]],
+) -> bool:
+    """
+    Send one channel's announcements in order, advancing last_seen_ts as we go.
+
+    Returns True if any series' last_seen_ts changed.
+    """
+    dirty = False
+    for tracked, series_id, messages in results:
+        sdata = tracked.get(series_id)
+        if sdata is None:
+            continue
+
+        # Only the series' own role may ping, whatever ends up in the text
+        role_id = sdata.role_id
+        mentions = discord.AllowedMentions(
+            everyone=False,
+            users=False,
+            roles=[discord.Object(role_id)] if role_id else False,
+        )
+        latest_ts_for_series = None
+
+        for msg, readable_at in messages:
+            try:
+                await channel.send(msg, allowed_mentions=mentions)
+            except discord.Forbidden:
+                logger.warning("No permission to send in channel %s", channel.id)
+                break
+            except Exception as e:
+                logger.error("Failed to send message in channel %s: %s", channel.id, e)
+                break
+
+            latest_ts_for_series = readable_at
+
+        if latest_ts_for_series:
+            sdata.set_last_seen(latest_ts_for_series)
+            dirty = True
+    return dirty
+
+
+_failed_cycles = 0
+_last_new_chapter_at = 0.0  # time.monotonic(), reset in before_check_releases
+
+
+def _apply_backoff(failed: bool, found_new: bool) -> None:
+    # Poll less often while nothing is being released, and double the interval
+    # for every consecutive failed cycle; both reset as soon as things recover
+    global _failed_cycles, _last_new_chapter_at
+    _failed_cycles = _failed_cycles + 1 if failed else 0
+    now = time.monotonic()
+    if found_new:
+        _last_new_chapter_at = now
+
+    base = POLL_INTERVAL_SECONDS
+    if now - _last_new_chapter_at >= QUIET_AFTER_SECONDS:
+        base = QUIET_POLL_INTERVAL_SECONDS
+    interval = min(base * 2 ** _failed_cycles, MAX_POLL_BACKOFF_SECONDS)
+    if check_releases.seconds != interval:
+        check_releases.change_interval(seconds=interval)
+
 
 @tasks.loop(seconds=POLL_INTERVAL_SECONDS)
 async def check_releases():
     await bot.wait_until_ready()
 
-    async with aiohttp.ClientSession() as session:
-        for guild in bot.guilds:
-            gdata = get_guild_data(guild.id)
-            channel_id = gdata.get("announce_channel_id")
-            if not channel_id:
-                continue
+    session = get_session()
 
-            channel = bot.get_channel(channel_id)
-            if channel is None:
-                try:
-                    channel = await bot.fetch_channel(channel_id)
-                except Exception:
-                    continue
+    # Fire every fetch at once; _fetch_semaphore bounds how many hit MangaDex
+    jobs = []  # (tracked, channel, task)
+    for guild in bot.guilds:
+        gdata = get_guild_data(guild.id)
+        channel_id = gdata.get("announce_channel_id")
+        if not channel_id:
+            continue
 
-            tracked = gdata.get("tracked_series", {})
-            if not tracked:
-                continue
+        channel = await resolve_channel(channel_id)
+        if channel is None:
+            continue
+
+        tracked = gdata.get("tracked_series", {})
+        # No await in these loops, so commands can't mutate tracked while we walk it
+        for series_id, sdata in tracked.items():
+            if not sdata.primed:
+                task = asyncio.create_task(_prime_series(session, tracked, series_id))
+                jobs.append((tracked, channel, task))
+
+        items = ((sid, sdata) for sid, sdata in tracked.items() if sdata.primed)
+        while chunk := list(itertools.islice(items, SERIES_PER_REQUEST)):
+            task = asyncio.create_task(_process_chunk(session, chunk))
+            jobs.append((tracked, channel, task))
+
+    if not jobs:
+        # nothing to poll; still let a backed-off interval recover
+        _apply_backoff(failed=False, found_new=False)
+        return
 
-            for series_id, sdata in list(tracked.items()):
-                last_seen_ts = sdata.get("last_seen_ts")
-                series_name = sdata.get("name", f"Series {series_id}")
-
-                # FIRST TIME: prime series so you don't get spammed by old chapters
-                if not last_seen_ts:
-                    try:
-                        all_recent = await fetch_latest_for_series(session, series_id, None)
-                    except Exception as e:
-                        print(f"[ERROR] MangaDex fetch (prime) failed for {series_id}: {e}")
-                        continue
-
-                    if all_recent:
-                        latest = all_recent[-1]  # list is oldest -> newest
-                        sdata["last_seen_ts"] = latest["readableAt"]
-                        gdata["tracked_series"][series_id] = sdata
-                        save_data(data)
-                        print(f"[INFO] Primed series {series_id} at {latest['readableAt']}")
-                    # skip notifications this cycle for newly added series
-                    continue
-
-                # NORMAL: only get chapters newer than last_seen_ts
-                try:
-                    new_chapters = await fetch_latest_for_series(
-                        session, series_id, last_seen_ts
-                    )
-                except Exception as e:
-                    print(f"[ERROR] MangaDex fetch failed for {series_id}: {e}")
-                    continue
-
-                if not new_chapters:
-                    continue
-
-                latest_ts_for_series = last_seen_ts
-
-                for ch in new_chapters:
-                    role_id = sdata.get("role_id")
-                    role_mention = f"<@&{role_id}>" if role_id else ""
-
-                    msg = (
-                        f"{role_mention} New chapter released!\n"
-                        f"**{series_name}** - Chapter {ch['chapter']}\n"
-                        f"Link: {ch['url']}"
-                    )
-                    try:
-                        await channel.send(msg)
-                    except discord.Forbidden:
-                        print(f"[WARN] No permission to send in channel {channel_id}")
-                        break
-                    except Exception as e:
-                        print(f"[ERROR] Failed to send message in channel {channel_id}: {e}")
-                        break
-
-                    latest_ts_for_series = ch["readableAt"]
-
-                if latest_ts_for_series:
-                    sdata["last_seen_ts"] = latest_ts_for_series
-                    gdata["tracked_series"][series_id] = sdata
-            save_data(data)
+    results = await asyncio.gather(*(task for _, _, task in jobs), return_exceptions=True)
+
+    per_channel: Dict[int, Tuple[discord.abc.Messageable, list]] = {}
+    for (tracked, channel, _), job_results in zip(jobs, results):
+        if isinstance(job_results, (RateLimited, FetchFailed)):
+            continue
+        if isinstance(job_results, BaseException):
+            logger.error("Release check failed", exc_info=job_results)
+            continue
+
+        for series_id, messages in job_results:
+            if series_id not in tracked:
+                # untracked while we were fetching
+                continue
+            if messages:
+                per_channel.setdefault(channel.id, (channel, []))[1].append(
+                    (tracked, series_id, messages)
+                )
+
+    # Channels are independent, but messages within a channel stay in order
+    announced = await asyncio.gather(
+        *(_announce(channel, items) for channel, items in per_channel.values())
+    )
+    if any(announced):
+        mark_dirty()
+
+    rate_limits = [r.delay for r in results if isinstance(r, RateLimited)]
+    if rate_limits:
+        delay = max(rate_limits)
+        logger.warning("MangaDex rate limited us, pausing %.0fs", delay)
+        await asyncio.sleep(delay)
+    _apply_backoff(
+        failed=any(isinstance(r, BaseException) for r in results),
+        found_new=bool(per_channel),
+    )
 
 
 @check_releases.before_loop
 async def before_check_releases():
-    print("Waiting for bot to be ready...")
+    logger.info("Waiting for bot to be ready...")
     await bot.wait_until_ready()
-    print("Release checker started.")
+
+    global _last_new_chapter_at
+    get_session()
+    _last_new_chapter_at = time.monotonic()
+
+    # Random offset so many instances (or quick restarts) don't poll in lockstep
+    await asyncio.sleep(random.uniform(0, START_JITTER_SECONDS))
+    logger.info("Release checker started.")
+
+
+@check_releases.after_loop
+async def after_check_releases():
+    await _final_flush()
+
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
 
 # ================== COMMANDS ==================
 
 
 @bot.event
 async def on_ready():
-    print(f"Logged in as {bot.user} (ID: {bot.user.id})")
+    logger.info("Logged in as %s (ID: %s)", bot.user, bot.user.id)
+    try:
+        await get_app_owner_id()
+    except Exception as e:
+        logger.warning("Could not fetch application owner: %s", e)
+    global _flusher_task
+    if _flusher_task is None or _flusher_task.done():
+        _flusher_task = asyncio.create_task(_flusher())
     if not check_releases.is_running():
         check_releases.start()
 
 
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    _channel_cache.pop(channel.id, None)
+
+
 @bot.command(name="set_announce_channel")
 @is_staff_or_owner()
 async def set_announce_channel(ctx: commands.Context, channel: discord.TextChannel):
     gdata = get_guild_data(ctx.guild.id)
     gdata["announce_channel_id"] = channel.id
-    save_data(data)
+    _channel_cache[channel.id] = channel
+    mark_dirty()
     await ctx.send(f"Announcement channel set to {channel.mention}.")
 
 
+_UUID_RE = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+)
+
+
 def extract_mangadex_id(series_arg: str) -> str:
     """
     Accept either a raw MangaDex ID or a full URL and return the ID.
@@ -275,12 +813,8 @@ def extract_mangadex_id(series_arg: str) -> str:
       - "a1b2c3d4-..."  -> same
       - "https://mangadex.org/title/a1b2c3d4-.../name" -> "a1b2c3d4-..."
     """
-    if "mangadex.org" in series_arg:
-        parts = series_arg.strip("/").split("/")
-        for part in parts:
-            if "-" in part and len(part) >= 8:
-                return part
-    return series_arg
+    m = _UUID_RE.search(series_arg)
+    return m.group(0) if m else series_arg
 
 
 @bot.command(name="track")
@@ -307,17 +841,30 @@ async def track_series(
 
     if series_id in tracked:
         await ctx.send(
-            f"Already tracking `{series_id}` as **{tracked[series_id]['name']}** "
-            f"with role <@&{tracked[series_id].get('role_id', 0)}>."
+            f"Already tracking `{series_id}` as **{tracked[series_id].name}** "
+            f"with role <@&{tracked[series_id].role_id or 0}>."
         )
         return
 
-    tracked[series_id] = {
-        "name": name,
-        "last_seen_ts": None,
-        "role_id": role.id,
-    }
-    save_data(data)
+    # Prime now so the poller only ever sees chapters released after this point
+    try:
+        last_seen_ts = await fetch_latest_readable_at(get_session(), series_id)
+    except RateLimited as e:
+        await ctx.send(f"MangaDex is rate limiting me, try again in {e.delay:.0f}s.")
+        return
+    except Exception as e:
+        logger.error("MangaDex fetch (prime) failed for %s: %s", series_id, e)
+        await ctx.send(f"Couldn't look up `{series_id}` on MangaDex. Check the ID and try again.")
+        return
+
+    if series_id in tracked:
+        # someone else tracked it while we were asking MangaDex
+        await ctx.send(f"Already tracking `{series_id}` as **{tracked[series_id].name}**.")
+        return
+
+    tracked[series_id] = Series(name=name, last_seen_ts=last_seen_ts, role_id=role.id)
+    mark_dirty()
+    logger.info("Primed series %s at %s", series_id, last_seen_ts)
     await ctx.send(
         f"Now tracking **{name}** (MangaDex ID: `{series_id}`), pinging role {role.mention}."
     )
@@ -336,8 +883,8 @@ async def untrack_series(ctx: commands.Context, series_id_or_url: str):
         return
 
     removed = tracked.pop(series_id)
-    save_data(data)
-    await ctx.send(f"Stopped tracking **{removed['name']}** (ID: `{series_id}`).")
+    mark_dirty()
+    await ctx.send(f"Stopped tracking **{removed.name}** (ID: `{series_id}`).")
 
 
 @bot.command(name="list_tracked")
@@ -352,12 +899,12 @@ async def list_tracked(ctx: commands.Context):
 
     lines = []
     for sid, sdata in tracked.items():
-        last_seen = sdata.get("last_seen_ts") or "none yet"
-        role_id = sdata.get("role_id")
+        last_seen = sdata.last_seen_ts or "none yet"
+        role_id = sdata.role_id
         role = ctx.guild.get_role(role_id) if role_id else None
         role_text = role.mention if role else "no role"
         lines.append(
-            f"- **{sdata['name']}** (ID: `{sid}`, role: {role_text}, last seen: `{last_seen}`)"
+            f"- **{sdata.name}** (ID: `{sid}`, role: {role_text}, last seen: `{last_seen}`)"
         )
 
     await ctx.send("Tracked series:\n" + "\n".join(lines))
@@ -378,13 +925,10 @@ async def test_release(ctx: commands.Context):
         await ctx.send("Announcement channel is not set. Use !set_announce_channel #channel first.")
         return
 
-    channel = bot.get_channel(channel_id)
+    channel = await resolve_channel(channel_id)
     if channel is None:
-        try:
-            channel = await bot.fetch_channel(channel_id)
-        except Exception:
-            await ctx.send("I couldn't fetch the announcement channel. Check my permissions.")
-            return
+        await ctx.send("I couldn't fetch the announcement channel. Check my permissions.")
+        return
 
     tracked = gdata.get("tracked_series", {})
     if not tracked:
@@ -393,8 +937,8 @@ async def test_release(ctx: commands.Context):
 
     # Just pick the first tracked series for testing
     series_id, sdata = next(iter(tracked.items()))
-    series_name = sdata.get("name", f"Series {series_id}")
-    role_id = sdata.get("role_id")
+    series_name = sdata.name
+    role_id = sdata.role_id
     role_mention = f"<@&{role_id}>" if role_id else ""
 
     msg = (